@@ -1,3 +1,7 @@
+import asyncio
+from collections import OrderedDict
+import time
+
 import discord
 from discord.ext import commands
 from discord.ui import Button, button, View
@@ -16,13 +20,16 @@ class EmbedPaginator(View):
         self.display_index.label = f"{self.index + 1}/{self.limit}"
         self.right.disabled = self.forward.disabled = self.index == self.limit - 1
 
+    async def get_embed(self, index):
+        return self.embeds[index]
+
     async def start(self):
         self.update()
-        await self.ctx.reply(embed=self.embeds[self.index], view=self)
+        await self.ctx.reply(embed=await self.get_embed(self.index), view=self)
 
     async def update_interaction(self, interaction: discord.Interaction):
         self.update()
-        await interaction.response.edit_message(embed=self.embeds[self.index], view=self)
+        await interaction.response.edit_message(embed=await self.get_embed(self.index), view=self)
 
     async def interaction_check(self, interaction: discord.Interaction):
         return interaction.user.id == self.ctx.author.id
@@ -50,3 +57,83 @@ class EmbedPaginator(View):
     async def forward(self, interaction: discord.Interaction, _):
         self.index = self.limit - 1
         await self.update_interaction(interaction)
+
+
+class LazyEmbedPaginator(EmbedPaginator):
+    def __init__(self, ctx, limit, loader, index = 0):
+        super().__init__(ctx, {}, index)
+        self.limit = limit
+        self.loader = loader
+
+    async def get_embed(self, index):
+        # Pages are built on first view and kept for when the user flips back
+        embed = self.embeds.get(index)
+        if embed is None:
+            embed = self.embeds[index] = await self.loader(index)
+        return embed
+
+
+def chunked_guild():
+    async def predicate(ctx: commands.Context):
+        # The library shares one chunk request per guild, and the members stay cached afterwards
+        if ctx.guild is not None and not ctx.guild.chunked:
+            await ctx.guild.chunk()
+        return True
+    return commands.check(predicate)
+
+
+class LRUCache:
+    def __init__(self, maxsize = 1024, ttl = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, _missing) is not _missing
+
+    def get(self, key, default = None):
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl = None):
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default = None):
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self):
+        self._data.clear()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def do(self, key, func, *args, **kwargs):
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func(*args, **kwargs))
+            self._calls[key] = future
+            future.add_done_callback(lambda _: self._calls.pop(key, None))
+        # Shield so one cancelled caller doesn't cancel the load for everyone else
+        return await asyncio.shield(future)
+
+
+_missing = object()
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+
+import aiohttp
+import discord
+
+import main
+
+
+log = logging.getLogger("cluster")
+
+
+async def get_shard_count(token):
+    headers = {"Authorization": f"Bot {token}"}
+    async with aiohttp.ClientSession(headers=headers) as session:
+        async with session.get("https://discord.com/api/v10/gateway/bot") as response:
+            response.raise_for_status()
+            return (await response.json())["shards"]
+
+
+def split_shards(shard_count, clusters):
+    # Contiguous ranges keep each cluster's shards spread across the identify buckets
+    return [list(range(i * shard_count // clusters, (i + 1) * shard_count // clusters)) for i in range(clusters)]
+
+
+def run_cluster(cluster_id, shard_ids, shard_count):
+    # Forked workers inherit the supervisor's handler, spawned ones start without any
+    if not logging.getLogger().handlers:
+        discord.utils.setup_logging()
+    asyncio.run(main.main(cluster_id=cluster_id, shard_ids=shard_ids, shard_count=shard_count))
+
+
+def start_cluster(cluster_id, shard_ids, shard_count):
+    process = multiprocessing.Process(
+        target=run_cluster,
+        args=(cluster_id, shard_ids, shard_count),
+        name=f"cluster-{cluster_id}",
+    )
+    process.start()
+    log.info("Started cluster %d (pid %d) with shards %d-%d", cluster_id, process.pid, shard_ids[0], shard_ids[-1])
+    return process
+
+
+def supervise(shard_count, clusters):
+    shards = split_shards(shard_count, clusters)
+    processes = {i: start_cluster(i, shard_ids, shard_count) for i, shard_ids in enumerate(shards)}
+    restarts = {i: 0.0 for i in processes}
+    try:
+        while True:
+            time.sleep(5.0)
+            for cluster_id, process in processes.items():
+                if process.is_alive():
+                    continue
+                # Back off if a cluster keeps dying right after being restarted
+                if time.monotonic() - restarts[cluster_id] < 30.0:
+                    continue
+                log.warning("Cluster %d exited with code %s, restarting", cluster_id, process.exitcode)
+                restarts[cluster_id] = time.monotonic()
+                processes[cluster_id] = start_cluster(cluster_id, shards[cluster_id], shard_count)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.join()
+
+
+if __name__ == "__main__":
+    discord.utils.setup_logging()
+    config = main.load_config()
+    clusters = config.getint("cluster", "clusters", fallback=1)
+    shard_count = config.get("cluster", "shard_count", fallback="")
+    if shard_count:
+        shard_count = int(shard_count)
+    else:
+        shard_count = asyncio.run(get_shard_count(config["bot"]["bot_token"] or os.getenv("BOT_TOKEN")))
+    supervise(shard_count, min(clusters, shard_count))
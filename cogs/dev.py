@@ -14,13 +14,13 @@ class Developer(commands.Cog):
     @commands.is_owner()
     async def db(self, ctx: commands.Context):
         """Get database information"""
-        memory = ctx.bot.redis.info("memory")
+        memory = await ctx.bot.redis.info("memory")
         redis_embed = discord.Embed(color=0xff4438)
         redis_embed.set_author(name="Redis", icon_url="https://avatars.githubusercontent.com/u/1529926")
         redis_embed.add_field(name="Used Memory", value=memory["used_memory_human"])
         redis_embed.add_field(name="Total System Memory", value=memory["total_system_memory_human"])
         redis_embed.add_field(name="Used Memory RSS", value=memory["used_memory_rss_human"])
-        redis_embed.set_footer(text=f"{ctx.bot.redis.dbsize()} dbsize")
+        redis_embed.set_footer(text=f"{await ctx.bot.redis.dbsize()} dbsize")
         models_embed = discord.Embed(color=0x31648c)
         models_embed.set_author(name="Models", icon_url="https://www.postgresql.org/media/img/about/press/elephant.png")
         total = 0
@@ -1,13 +1,15 @@
 import aiohttp
+import asyncio
 import json
 from random import randint
 import re
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord.ui import button, Modal, TextInput, View
+from redis import RedisError
 
-from apacheutil import EmbedPaginator
+from apacheutil import EmbedPaginator, LRUCache, SingleFlight
 
 
 levels = (
@@ -227,6 +229,32 @@ emojis_bloons = {
     "MAP": "<:MapBeginnerBtn:1266797307299495968>",
 }
 
+BLOONS_TTL = 43200
+BLOONS_STALE_TTL = 259200
+# Refresh once a value is within 30 minutes of its 12 hour freshness window
+BLOONS_REFRESH_TTL = BLOONS_STALE_TTL - BLOONS_TTL + 1800
+
+
+def _boss_resources(bosses):
+    for boss in bosses:
+        yield boss["metadataStandard"], f"bloons:bosses:{boss["id"]}:standard"
+        yield boss["metadataElite"], f"bloons:bosses:{boss["id"]}:elite"
+
+
+def _challenge_resources(challenges):
+    for challenge in challenges:
+        yield challenge["metadata"], f"bloons:challenges:daily:{challenge["id"]}"
+
+
+def _race_resources(races):
+    for race in races:
+        yield race["metadata"], f"bloons:races:{race["id"]}"
+
+
+bloons_bosses = ("https://data.ninjakiwi.com/btd6/bosses", "bloons:bosses", _boss_resources)
+bloons_challenges = ("https://data.ninjakiwi.com/btd6/challenges/filter/daily", "bloons:challenges:daily", _challenge_resources)
+bloons_races = ("https://data.ninjakiwi.com/btd6/races", "bloons:races", _race_resources)
+
 _roll_r = re.compile(r"^(?:(\d{1,2})d)?(\d{1,4})([+-]\d{1,4})?$")
 
 
@@ -321,6 +349,9 @@ class Entertainment(commands.Cog):
     def __init__(self, bot: commands.AutoShardedBot):
         super().__init__()
         self.bot = bot
+        self.bloons_loads = SingleFlight()
+        self.bloons_fetches = asyncio.Semaphore(8)
+        self.bloons_pages = LRUCache(maxsize=8, ttl=BLOONS_TTL)
 
     @commands.command()
     async def lenny(self, ctx: commands.Context):
@@ -344,16 +375,84 @@ class Entertainment(commands.Cog):
         return embed
 
     async def _get_bloons_resource(self, url: str, redis_name: str):
-        resource = self.bot.redis.get(redis_name)
+        return await self.bloons_loads.do(redis_name, self._load_bloons_resource, url, redis_name)
+
+    async def _load_bloons_resource(self, url: str, redis_name: str):
+        resource = await self.bot.redis.get(redis_name)
         if resource:
             return json.loads(resource)
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                body = await response.json()
-                resource = body.get("body") if body.get("success") else None
-                self.bot.redis.set(redis_name, json.dumps(resource, separators=(",", ":")))
-                self.bot.redis.expire(redis_name, 43200)
-                return resource
+        return await self._refresh_bloons_resource(url, redis_name)
+
+    async def _refresh_bloons_resource(self, url: str, redis_name: str):
+        async with self.bloons_fetches:
+            try:
+                async with self.bot.session.get(url) as response:
+                    body = await response.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                body = {}
+            resource = body.get("body") if body.get("success") else None
+            # Never let a failed fetch overwrite what we already have
+            if resource is not None:
+                await self.bot.redis.set(redis_name, json.dumps(resource, separators=(",", ":")), ex=BLOONS_STALE_TTL)
+        return resource
+
+    async def _revalidate_bloons_resources(self, resources):
+        resources = list(resources)
+        async with self.bot.redis.pipeline(transaction=False) as pipe:
+            for _, redis_name in resources:
+                pipe.ttl(redis_name)
+            ttls = await pipe.execute()
+        await asyncio.gather(*(
+            self.bloons_loads.do(redis_name, self._refresh_bloons_resource, url, redis_name)
+            for (url, redis_name), ttl in zip(resources, ttls)
+            if ttl < BLOONS_REFRESH_TTL
+        ))
+
+    async def _get_bloons_pages(self, index):
+        url, redis_name, expand = index
+        items = await self._get_bloons_resource(url, redis_name)
+        resources = list(expand(items or ()))
+        # The document keys embed the upstream ids, so they identify this version of the pages
+        version = tuple(name for _, name in resources)
+        cached = self.bloons_pages.get(redis_name)
+        if cached and cached[0] == version:
+            return cached[1]
+        # One round trip for every document, only the misses go through the bounded fetches
+        stored = await self.bot.redis.mget([name for _, name in resources]) if resources else []
+        documents = [json.loads(d) if d else None for d in stored]
+        misses = [i for i, d in enumerate(documents) if d is None]
+        fetched = await asyncio.gather(*(
+            self.bloons_loads.do(resources[i][1], self._refresh_bloons_resource, *resources[i])
+            for i in misses
+        ))
+        for i, document in zip(misses, fetched):
+            documents[i] = document
+        embeds = [self._create_bloons_document(d) for d in documents if d]
+        if all(documents):
+            self.bloons_pages.set(redis_name, (version, embeds))
+        return embeds
+
+    @tasks.loop(minutes=10.0)
+    async def bloons_refresher(self):
+        # Only one process needs to refresh the shared keys
+        if not await self.bot.redis.set("bloons:refresher", 1, nx=True, ex=540):
+            return
+        for url, redis_name, expand in (bloons_bosses, bloons_challenges, bloons_races):
+            await self._revalidate_bloons_resources([(url, redis_name)])
+            items = await self._get_bloons_resource(url, redis_name)
+            if items:
+                await self._revalidate_bloons_resources(expand(items))
+
+    @bloons_refresher.before_loop
+    async def before_bloons_refresher(self):
+        await self.bot.wait_until_ready()
+
+    async def cog_load(self):
+        self.bloons_refresher.add_exception_type(RedisError)
+        self.bloons_refresher.start()
+
+    async def cog_unload(self):
+        self.bloons_refresher.cancel()
 
     @commands.group()
     @commands.cooldown(1, 15.0, commands.BucketType.user)
@@ -364,39 +463,21 @@ class Entertainment(commands.Cog):
     async def boss(self, ctx: commands.Context):
         """Get boss information"""
         await ctx.typing()
-        bosses = await self._get_bloons_resource("https://data.ninjakiwi.com/btd6/bosses", "bloons:bosses")
-        embeds = []
-        for boss in bosses:
-            standard = await self._get_bloons_resource(boss["metadataStandard"], f"bloons:bosses:{boss["id"]}:standard")
-            if standard:
-                embeds.append(self._create_bloons_document(standard))
-            elite = await self._get_bloons_resource(boss["metadataElite"], f"bloons:bosses:{boss["id"]}:elite")
-            if elite:
-                embeds.append(self._create_bloons_document(elite))
+        embeds = await self._get_bloons_pages(bloons_bosses)
         await EmbedPaginator(ctx, embeds).start()
 
     @bloons.command(aliases=["daily", "advanced", "coop"])
     async def challenge(self, ctx: commands.Context):
         """Get daily challenge information"""
         await ctx.typing()
-        challenges = await self._get_bloons_resource("https://data.ninjakiwi.com/btd6/challenges/filter/daily", "bloons:challenges:daily")
-        embeds = []
-        for challenge in challenges:
-            document = await self._get_bloons_resource(challenge["metadata"], f"bloons:challenges:daily:{challenge["id"]}")
-            if document:
-                embeds.append(self._create_bloons_document(document))
+        embeds = await self._get_bloons_pages(bloons_challenges)
         await EmbedPaginator(ctx, embeds).start()
 
     @bloons.command()
     async def race(self, ctx: commands.Context):
         """Get race information"""
         await ctx.typing()
-        races = await self._get_bloons_resource("https://data.ninjakiwi.com/btd6/races", "bloons:races")
-        embeds = []
-        for race in races:
-            document = await self._get_bloons_resource(race["metadata"], f"bloons:races:{race["id"]}")
-            if document:
-                embeds.append(self._create_bloons_document(document))
+        embeds = await self._get_bloons_pages(bloons_races)
         await EmbedPaginator(ctx, embeds).start()
 
     @commands.command(aliases=["die", "dice"])
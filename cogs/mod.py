@@ -1,63 +1,415 @@
+import asyncio
 import datetime
 import json
+import logging
 import math
 import re
 from string import Template
+import time
 
 import discord
 from discord.ext import commands
 from discord.ui import button, Button, Modal, TextInput, View
 
+from apacheutil import chunked_guild
+
 
 ONE_WEEK = datetime.timedelta(days=7)
 ONE_MONTH = datetime.timedelta(days=30)
+BULK_BAN_LIMIT = 200
+MAX_EMBEDS = 10
+# Discord's limit on the combined length of every embed in one message
+MAX_EMBED_CHARS = 6000
+# Bulk deletes reject anything older than two weeks, keep a little slack for clock drift
+BULK_DELETE_AGE = datetime.timedelta(days=14, minutes=-5)
+
+log = logging.getLogger("apachengine")
+
+
+def _guild_keys(guild: discord.Guild):
+    return {
+        "server": guild.name,
+        "server_icon": guild.icon.url if guild.icon else "",
+        "system_channel": guild.system_channel.mention if guild.system_channel else "",
+        "rules_channel": guild.rules_channel.mention if guild.rules_channel else "",
+    }
 
 
-def _format(string, keys):
-    return Template(string).safe_substitute(keys)
+def _bind(string, keys):
+    # Like safe_substitute, but leaves $$ escapes alone so the result is still a template
+    def replace(match):
+        name = match.group("named") or match.group("braced")
+        return keys[name] if name in keys else match.group()
+    return Template.pattern.sub(replace, string)
+
+
+def _welcome_templates(config, guild: discord.Guild):
+    # Compiled once per loaded config with the guild keys already filled in, rebuilt if the guild changes
+    keys = _guild_keys(guild)
+    version = tuple(keys.values())
+    cached = getattr(config, "_welcome_templates", None)
+    if cached and cached[0] == version:
+        return cached[1]
+    bound = {k: v.replace("$", "$$") for k, v in keys.items()}
+    templates = tuple(
+        Template(_bind(string, bound)) if string is not None else None
+        for string in (config.welcome_title, config.welcome_description, config.welcome_image, config.welcome_footer)
+    )
+    config._welcome_templates = (version, templates)
+    return templates
+
+
+def _format(template, keys):
+    return template.safe_substitute(keys) if template else None
 
 
 def _on_member_join_embed(config, member: discord.Member):
-    guild = member.guild
+    title, description, image, footer = _welcome_templates(config, member.guild)
     keys = {
         "user": member.global_name or member.name,
         "mention": member.mention,
         "avatar": member.display_avatar.url,
-        "member_count": guild.member_count,
-        "server": guild.name,
-        "server_icon": guild.icon.url if guild.icon else "",
-        "system_channel": guild.system_channel.mention if guild.system_channel else "",
-        "rules_channel": guild.rules_channel.mention if guild.rules_channel else "",
+        "member_count": member.guild.member_count,
     }
     embed = discord.Embed(
-        description=_format(config.welcome_description, keys),
+        description=_format(description, keys),
     )
     embed.set_author(
-        name=_format(config.welcome_title, keys),
+        name=_format(title, keys),
         icon_url=member.display_avatar.url,
     )
-    embed.set_image(url=_format(config.welcome_image, keys))
-    embed.set_footer(text=_format(config.welcome_footer, keys))
+    embed.set_image(url=_format(image, keys))
+    embed.set_footer(text=_format(footer, keys))
     return embed
 
 
-def _rank_member_suspicion(_ctx: commands.Context, member, now):
-    if member.bot or member.guild_permissions.ban_members:
-        return 0
+_numeric_suffix_r = re.compile(r"\d{5,}$")
+
+
+def _static_member_suspicion(member):
     conditions = 0
     if member.public_flags.spammer:
         conditions += 3
     if member.avatar is None:
         conditions += 1
-    if re.search(r"\d{5,}$", member.name):
+    if _numeric_suffix_r.search(member.name):
         conditions += 1
+    return conditions
+
+
+def _recent_member_suspicion(member, now):
+    conditions = 0
     if now - member.created_at < ONE_MONTH:
         conditions += 1
-    if now - member.joined_at < ONE_WEEK:
+    if member.joined_at and now - member.joined_at < ONE_WEEK:
         conditions += 1
     return conditions
 
 
+def _rank_member_suspicion(_ctx: commands.Context, member, now):
+    if member.bot or member.guild_permissions.ban_members:
+        return 0
+    return _static_member_suspicion(member) + _recent_member_suspicion(member, now)
+
+
+class SuspicionIndex:
+    # Members bucketed by the part of their score that doesn't decay with time
+    max_static = 5
+    max_recent = 2
+
+    def __init__(self):
+        self._scores = {}
+        self._buckets = {}
+
+    def __contains__(self, guild_id):
+        return guild_id in self._scores
+
+    def rebuild(self, guild: discord.Guild):
+        scores = {}
+        buckets = [set() for _ in range(self.max_static + 1)]
+        static = _static_member_suspicion
+        for member in guild.members:
+            if member.bot:
+                continue
+            score = scores[member.id] = static(member)
+            buckets[score].add(member.id)
+        self._scores[guild.id] = scores
+        self._buckets[guild.id] = buckets
+
+    def update(self, member: discord.Member):
+        scores = self._scores.get(member.guild.id)
+        if scores is None or member.bot:
+            return
+        buckets = self._buckets[member.guild.id]
+        previous = scores.get(member.id)
+        if previous is not None:
+            buckets[previous].discard(member.id)
+        score = scores[member.id] = _static_member_suspicion(member)
+        buckets[score].add(member.id)
+
+    def remove(self, guild_id, member_id):
+        scores = self._scores.get(guild_id)
+        if scores is None:
+            return
+        previous = scores.pop(member_id, None)
+        if previous is not None:
+            self._buckets[guild_id][previous].discard(member_id)
+
+    def drop(self, guild_id):
+        self._scores.pop(guild_id, None)
+        self._buckets.pop(guild_id, None)
+
+    def query(self, guild: discord.Guild, threshold, now):
+        if guild.id not in self._scores:
+            self.rebuild(guild)
+        buckets = self._buckets[guild.id]
+        members = []
+        # Only buckets that could still cross the threshold once recency is added are visited
+        for score in range(max(threshold - self.max_recent + 1, 0), self.max_static + 1):
+            for member_id in buckets[score]:
+                member = guild.get_member(member_id)
+                if member and _rank_member_suspicion(None, member, now) > threshold:
+                    members.append(member)
+        return members
+
+
+class WelcomeQueue:
+    def __init__(self, delay = 2.0):
+        self.delay = delay
+        self._pending = {}
+        self._flushes = set()
+
+    def push(self, channel, embed: discord.Embed):
+        pending = self._pending.get(channel.id)
+        if pending is None:
+            pending = self._pending[channel.id] = []
+            task = asyncio.create_task(self._flush(channel))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+        pending.append(embed)
+
+    async def _flush(self, channel):
+        await asyncio.sleep(self.delay)
+        embeds = self._pending.pop(channel.id)
+        # Capping each window keeps a busy join log under the channel's rate limit
+        content = None
+        if len(embeds) > MAX_EMBEDS:
+            overflow = len(embeds) - MAX_EMBEDS + 1
+            content = f"...and **{overflow}** more member{"" if overflow == 1 else "s"} joined."
+            embeds = embeds[:MAX_EMBEDS - 1]
+        for batch in _pack_embeds(embeds):
+            try:
+                await channel.send(content=content, embeds=batch)
+            except discord.HTTPException as e:
+                log.warning("Failed to post %d welcome embeds in channel %d: %s", len(batch), channel.id, e)
+            content = None
+
+
+def _pack_embeds(embeds):
+    # Splits embeds into messages that stay under both the count and the total length limits
+    batches = [[]]
+    size = 0
+    for embed in embeds:
+        if batches[-1] and (len(batches[-1]) == MAX_EMBEDS or size + len(embed) > MAX_EMBED_CHARS):
+            batches.append([])
+            size = 0
+        batches[-1].append(embed)
+        size += len(embed)
+    return batches
+
+
+class _JoinRing:
+    __slots__ = ("times", "index")
+
+    def __init__(self, size):
+        self.times = [float("-inf")] * size
+        self.index = 0
+
+    def push(self, now):
+        # Returns the time span covered by the last len(times) joins
+        self.times[self.index] = now
+        self.index = (self.index + 1) % len(self.times)
+        return now - self.times[self.index]
+
+
+class RaidDetector:
+    def __init__(self, joins, suspicious_joins, window, cooldown):
+        self.joins = joins
+        self.suspicious_joins = suspicious_joins
+        self.window = window
+        self.cooldown = cooldown
+        self._joins = {}
+        self._suspicious_joins = {}
+        self._flagged_until = {}
+
+    def record(self, guild_id, now, suspicious):
+        joins = self._joins.get(guild_id)
+        if joins is None:
+            joins = self._joins[guild_id] = _JoinRing(self.joins)
+        raid = joins.push(now) <= self.window
+        if suspicious:
+            suspicious_joins = self._suspicious_joins.get(guild_id)
+            if suspicious_joins is None:
+                suspicious_joins = self._suspicious_joins[guild_id] = _JoinRing(self.suspicious_joins)
+            raid = suspicious_joins.push(now) <= self.window or raid
+        if not raid or now < self._flagged_until.get(guild_id, 0.0):
+            return False
+        self._flagged_until[guild_id] = now + self.cooldown
+        return True
+
+    def drop(self, guild_id):
+        self._joins.pop(guild_id, None)
+        self._suspicious_joins.pop(guild_id, None)
+        self._flagged_until.pop(guild_id, None)
+
+
+class BanJobs:
+    # Jobs live in Redis so an interrupted massban picks up where it stopped after a restart
+    def __init__(self, bot):
+        self.bot = bot
+        self._running = {}
+
+    async def start(self, ctx: commands.Context, user_ids, reason = None):
+        if not user_ids:
+            return await ctx.reply(":x: No members to ban.")
+        job_id = ctx.message.id
+        message = await ctx.reply(f":hammer: Banning **0**/{len(user_ids)} members...")
+        async with self.bot.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(f"mod_jobs:{job_id}", mapping={
+                "guild_id": ctx.guild.id,
+                "channel_id": ctx.channel.id,
+                "message_id": message.id,
+                "reason": reason or "",
+                "total": len(user_ids),
+                "banned": 0,
+                "failed": 0,
+            })
+            pipe.rpush(f"mod_jobs:{job_id}:users", *user_ids)
+            pipe.sadd("mod_jobs", job_id)
+            await pipe.execute()
+        self._spawn(job_id)
+
+    async def resume(self):
+        for job_id in await self.bot.redis.smembers("mod_jobs"):
+            job_id = int(job_id)
+            if job_id in self._running:
+                continue
+            guild_id = await self.bot.redis.hget(f"mod_jobs:{job_id}", "guild_id")
+            if guild_id is None:
+                await self.bot.redis.srem("mod_jobs", job_id)
+            elif self.bot.get_guild(int(guild_id)):
+                self._spawn(job_id)
+
+    def cancel(self):
+        for task in self._running.values():
+            task.cancel()
+
+    def _spawn(self, job_id):
+        task = self._running[job_id] = asyncio.create_task(self._run(job_id))
+        task.add_done_callback(lambda _: self._running.pop(job_id, None))
+
+    async def _run(self, job_id):
+        redis_name = f"mod_jobs:{job_id}"
+        job = await self.bot.redis.hgetall(redis_name)
+        guild = self.bot.get_guild(int(job["guild_id"]))
+        channel = guild.get_channel(int(job["channel_id"]))
+        message = channel.get_partial_message(int(job["message_id"])) if channel else None
+        total = int(job["total"])
+        banned = int(job["banned"])
+        failed = int(job["failed"])
+        while user_ids := await self.bot.redis.lrange(f"{redis_name}:users", 0, BULK_BAN_LIMIT - 1):
+            # The HTTP client queues each chunk behind the route's rate limit bucket
+            try:
+                result = await guild.bulk_ban([discord.Object(int(i)) for i in user_ids], reason=job["reason"] or None)
+                banned += len(result.banned)
+                failed += len(result.failed)
+            except discord.HTTPException:
+                failed += len(user_ids)
+            async with self.bot.redis.pipeline(transaction=True) as pipe:
+                pipe.ltrim(f"{redis_name}:users", len(user_ids), -1)
+                pipe.hset(redis_name, mapping={"banned": banned, "failed": failed})
+                await pipe.execute()
+            if message:
+                # A deleted progress message or a missing permission shouldn't stop the bans
+                try:
+                    await message.edit(content=f":hammer: Banning **{banned + failed}**/{total} members...")
+                except discord.HTTPException:
+                    message = None
+        async with self.bot.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(redis_name, f"{redis_name}:users")
+            pipe.srem("mod_jobs", job_id)
+            await pipe.execute()
+        if message:
+            s = "" if banned == 1 else "s"
+            try:
+                await message.edit(content=f":white_check_mark: Banned **{banned}** member{s}.{f" Failed to ban **{failed}**." if failed else ""}")
+            except discord.HTTPException:
+                pass
+
+
+class PurgeFlags(commands.FlagConverter):
+    user: discord.User = None
+    match: str = None
+    bots: bool = False
+    attachments: bool = False
+    reason: str = commands.flag(default=None, positional=True)
+
+
+def _purge_check(flags: PurgeFlags):
+    pattern = re.compile(flags.match) if flags.match else None
+    def check(message: discord.Message):
+        if flags.user and message.author.id != flags.user.id:
+            return False
+        if flags.bots and not message.author.bot:
+            return False
+        if flags.attachments and not message.attachments:
+            return False
+        if pattern and not pattern.search(message.content):
+            return False
+        return True
+    return check
+
+
+async def _purge_messages(channel, limit, check, before = None, reason = None):
+    cutoff = discord.utils.utcnow() - BULK_DELETE_AGE
+    deleted = 0
+    bulk = []
+    # History comes back newest first in pages of 100, matching the bulk delete cap
+    async for message in channel.history(limit=limit, before=before):
+        if not check(message):
+            continue
+        if message.created_at > cutoff:
+            bulk.append(message)
+            if len(bulk) == 100:
+                await channel.delete_messages(bulk, reason=reason)
+                deleted += len(bulk)
+                bulk = []
+            continue
+        # Too old to bulk delete, these go through the single message route one at a time
+        try:
+            await message.delete()
+            deleted += 1
+        except discord.NotFound:
+            pass
+    if bulk:
+        await channel.delete_messages(bulk, reason=reason)
+        deleted += len(bulk)
+    return deleted
+
+
+async def _lockdown(guild: discord.Guild, delay, reason = None):
+    permissions = discord.Permissions(
+        add_reactions=False,
+        send_messages=False,
+    )
+    await guild.default_role.edit(permissions=permissions, reason=reason)
+    await guild.edit(
+        dms_disabled_until=delay,
+        invites_disabled=True,
+        reason=reason,
+    )
+
+
 class JoinLogConfigureModal(Modal):
     def __init__(self, view, previous_interaction: discord.Interaction, config):
         super().__init__(title=f"Configure Join Log for {view.ctx.guild.name}")
@@ -109,7 +461,7 @@ class JoinLogConfigureModal(Modal):
         channel = interaction.guild.get_channel(int(self.channel.value)) if self.channel.value.isdigit() else None
         if channel is None or channel.type != discord.ChannelType.text:
             return await interaction.response.send_message(":x: Invalid channel provided. Please try again.", ephemeral=True)
-        _fake_config = await self.view.ctx.bot.update_guild_config(
+        config = await self.view.ctx.bot.update_guild_config(
             self.view.ctx.guild,
             join_log=channel.id,
             welcome_title=self.welcome_title.value.strip(),
@@ -120,7 +472,7 @@ class JoinLogConfigureModal(Modal):
         await self.previous_interaction.edit_original_response(view=self.view)
         await interaction.response.send_message(
             f":white_check_mark: Set the join log to <#{channel.id}>. Your join log will look like this:",
-            embed=_on_member_join_embed(_fake_config, interaction.user),
+            embed=_on_member_join_embed(config, interaction.user),
         )
 
 
@@ -150,6 +502,18 @@ class Moderation(commands.Cog):
     def __init__(self, bot: commands.AutoShardedBot):
         super().__init__()
         self.bot = bot
+        self.suspicion = SuspicionIndex()
+        config = bot.config
+        self.raids = RaidDetector(
+            joins=config.getint("raid", "joins", fallback=15),
+            suspicious_joins=config.getint("raid", "suspicious_joins", fallback=5),
+            window=config.getfloat("raid", "window", fallback=10.0),
+            cooldown=config.getfloat("raid", "cooldown", fallback=600.0),
+        )
+        self.bans = BanJobs(bot)
+        self.welcomes = WelcomeQueue(config.getfloat("bot", "welcome_delay", fallback=2.0))
+        self.raid_lockdown = config.getboolean("raid", "lockdown", fallback=False)
+        self.raid_lockdown_duration = config.get("raid", "lockdown_duration", fallback="1h")
 
     @commands.command()
     @commands.bot_has_permissions(kick_members=True)
@@ -181,17 +545,17 @@ class Moderation(commands.Cog):
         confirm = await ctx.confirm(delete=True, content=f"```\n{c}\n```\n\n:question: Ban **{n}** member{s}? [y/n]")
         if not confirm:
             return await confirm.respond(":x: Operation aborted.")
-        await ctx.guild.bulk_ban(users)
-        await ctx.reply(f":white_check_mark: Banned **{n}** member{s}.")
+        await self.bans.start(ctx, [u.id for u in users])
 
     @commands.command(aliases=["bulkban"])
     @commands.bot_has_permissions(ban_members=True)
     @commands.has_permissions(ban_members=True)
     @commands.guild_only()
+    @chunked_guild()
     async def massban(self, ctx: commands.Context, *, reason = None):
         """Ban suspicious members from the server"""
         now = datetime.datetime.now(datetime.timezone.utc)
-        members = [m for m in ctx.guild.members if _rank_member_suspicion(ctx, m, now) > 3]
+        members = self.suspicion.query(ctx.guild, 3, now)
         n = len(members)
         if n == 0:
             return await ctx.reply(":detective: No members detected.")
@@ -200,18 +564,18 @@ class Moderation(commands.Cog):
         confirm = await ctx.confirm(delete=True, content=f"```\n{c}\n```\n\n:question: Ban **{n}** member{s}? [y/n]")
         if not confirm:
             return await confirm.respond(":x: Operation aborted.")
-        await ctx.guild.bulk_ban(members, reason=reason)
-        await ctx.reply(f":white_check_mark: Banned **{n}** member{s}.")
+        await self.bans.start(ctx, [m.id for m in members], reason)
 
     @commands.command(aliases=["suspicious"])
     @commands.guild_only()
+    @chunked_guild()
     async def sus(self, ctx: commands.Context, user: discord.Member = None):
         """Show suspicious members in a server"""
         now = datetime.datetime.now(datetime.timezone.utc)
         if user:
             sus_rank = _rank_member_suspicion(ctx, user, now)
             return await ctx.reply(f":detective: {user.name} has a suspicious ranking of **{sus_rank}**.")
-        members = [m for m in ctx.guild.members if _rank_member_suspicion(ctx, m, now) > 3]
+        members = self.suspicion.query(ctx.guild, 3, now)
         n = len(members)
         if n == 0:
             return await ctx.reply(":detective: No members detected.")
@@ -263,17 +627,22 @@ class Moderation(commands.Cog):
     @commands.bot_has_permissions(manage_messages=True)
     @commands.has_permissions(manage_messages=True)
     @commands.guild_only()
-    async def clear(self, ctx: commands.Context, limit = 100, *, reason = None):
+    async def clear(self, ctx: commands.Context, limit: int = 100, *, flags: PurgeFlags):
         """Clear messages from a channel"""
+        try:
+            check = _purge_check(flags)
+        except re.error:
+            return await ctx.reply(":x: Invalid pattern. Please try again.")
         s = "" if limit == 1 else "s"
-        confirm = await ctx.confirm(delete=False, content=f":question: Delete **{limit}** message{s}? [y/n]")
+        confirm = await ctx.confirm(delete=False, content=f":question: Scan **{limit}** message{s} for deletion? [y/n]")
         if not confirm:
             await confirm.question.delete()
             confirm.question = None
             return await confirm.respond(":x: Operation aborted.")
-        await ctx.channel.delete_messages([ctx.message, confirm.question, confirm.answer], reason=reason)
-        await ctx.channel.purge(limit=limit, reason=reason)
-        await ctx.send(content=f":white_check_mark: Deleted **{limit}** message{s}.", delete_after=5)
+        await ctx.channel.delete_messages([ctx.message, confirm.question, confirm.answer], reason=flags.reason)
+        deleted = await _purge_messages(ctx.channel, limit, check, before=ctx.message, reason=flags.reason)
+        s = "" if deleted == 1 else "s"
+        await ctx.send(content=f":white_check_mark: Deleted **{deleted}** message{s}.", delete_after=5)
 
     @commands.command(aliases=["close"])
     @commands.bot_has_permissions(manage_channels=True)
@@ -309,17 +678,8 @@ class Moderation(commands.Cog):
         """Disable messages and invites"""
         if not ctx.guild.default_role.permissions.send_messages:
             return
-        permissions = discord.Permissions(
-            add_reactions=False,
-            send_messages=False,
-        )
-        await ctx.guild.default_role.edit(permissions=permissions, reason=reason)
         delay = datetime.datetime.now(datetime.timezone.utc) + self.bot.parse_time(until, True)
-        await ctx.guild.edit(
-            dms_disabled_until=delay,
-            invites_disabled=True,
-            reason=reason,
-        )
+        await _lockdown(ctx.guild, delay, reason)
         await ctx.reply(f":warning: Lockdown active until <t:{math.floor(delay.timestamp())}>. Click **Report Raid** :shield: if there a raid.")
 
     @commands.command(aliases=["lockup"])
@@ -472,8 +832,53 @@ class Moderation(commands.Cog):
             return await ctx.reply(f":speech_balloon: The join log for this server is <#{config.join_log}>.", view=JoinLogConfigure(ctx))
         return await ctx.reply(":speech_balloon: There is no join log for this server. Click **:gear: Configure** to get started.", view=JoinLogConfigure(ctx))
 
+    async def cog_unload(self):
+        self.bans.cancel()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        await self.bans.resume()
+
+    @commands.Cog.listener()
+    async def on_member_update(self, _before: discord.Member, after: discord.Member):
+        self.suspicion.update(after)
+
+    @commands.Cog.listener()
+    async def on_user_update(self, _before: discord.User, after: discord.User):
+        for guild in after.mutual_guilds:
+            if guild.id in self.suspicion and (member := guild.get_member(after.id)):
+                self.suspicion.update(member)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        self.suspicion.remove(member.guild.id, member.id)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.suspicion.drop(guild.id)
+        self.raids.drop(guild.id)
+
+    async def _on_raid(self, guild: discord.Guild):
+        config = await self.bot.get_guild_config(guild)
+        permissions = guild.me.guild_permissions
+        locked = False
+        if self.raid_lockdown and permissions.manage_guild and permissions.manage_roles and guild.default_role.permissions.send_messages:
+            delay = datetime.datetime.now(datetime.timezone.utc) + self.bot.parse_time(self.raid_lockdown_duration, True)
+            await _lockdown(guild, delay, "Raid detected")
+            locked = True
+        channel = self.bot.get_channel(config.mod_log) if config.mod_log else None
+        if channel and channel.permissions_for(guild.me).send_messages:
+            if locked:
+                await channel.send(f":rotating_light: Raid detected. Lockdown active until <t:{math.floor(delay.timestamp())}>.")
+            else:
+                await channel.send(":rotating_light: Raid detected. Use `lockdown` to stop new members from joining.")
+
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
+        self.suspicion.update(member)
+        suspicious = _rank_member_suspicion(None, member, member.joined_at or discord.utils.utcnow()) > 3
+        if self.raids.record(member.guild.id, time.monotonic(), suspicious):
+            await self._on_raid(member.guild)
         if not member.guild.me.guild_permissions.manage_roles:
             return
         config = await self.bot.get_guild_config(member.guild)
@@ -481,7 +886,7 @@ class Moderation(commands.Cog):
             return
         channel = self.bot.get_channel(config.join_log)
         if channel and channel.permissions_for(member.guild.me).send_messages:
-            await channel.send(embed=_on_member_join_embed(config, member))
+            self.welcomes.push(channel, _on_member_join_embed(config, member))
 
 
 async def setup(bot):
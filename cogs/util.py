@@ -8,6 +8,8 @@ import discord
 from discord import ActivityType, ChannelType, Status
 from discord.ext import commands
 
+from apacheutil import chunked_guild
+
 
 channel_types = {
     ChannelType.text: "Text Channels",
@@ -54,6 +56,11 @@ def closest_color(r, g, b):
     return c
 
 
+def owner_color(guild: discord.Guild):
+    # The owner is only cached once the guild has been chunked or they've been seen
+    return guild.owner.color if guild.owner else discord.Color.default()
+
+
 def rgb_to_cmyk(r, g, b):
     k = max(r, g, b)
     if k == 0:
@@ -111,8 +118,9 @@ class Utility(commands.Cog):
         embed.add_field(name="Python", value=f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}")
         embed.add_field(name="Version", value="2.1.0")
         embed.add_field(name="discord.py", value=discord.__version__)
-        embed.add_field(name="Guilds", value=len(ctx.bot.guilds))
-        embed.add_field(name="Users", value=len(ctx.bot.users))
+        guilds, users = await ctx.bot.get_cluster_stats()
+        embed.add_field(name="Guilds", value=guilds)
+        embed.add_field(name="Users", value=users)
         embed.add_field(name="Latency", value=f"{ctx.bot.latency * 1000:.2f} ms")
         embed.add_field(name="Uptime", value=f"{uptime.total_seconds() / 60:.2f} m")
         embed.add_field(name="CPU Usage", value=f"{ctx.bot.process.cpu_percent():.2f}%")
@@ -167,13 +175,13 @@ class Utility(commands.Cog):
         embed = discord.Embed(
             title=ctx.guild.name,
             description=ctx.guild.description,
-            color=ctx.guild.owner.color,
+            color=owner_color(ctx.guild),
         )
         if ctx.guild.icon:
             embed.set_thumbnail(url=ctx.guild.icon.url)
         embed.add_field(name="Created", value=f"<t:{floor(ctx.guild.created_at.timestamp())}>")
         embed.add_field(name="Channels", value=len(ctx.guild.channels))
-        embed.add_field(name="Members", value=len(ctx.guild.members))
+        embed.add_field(name="Members", value=ctx.guild.member_count)
         embed.add_field(name="Emojis", value=len(ctx.guild.emojis))
         embed.add_field(name="Stickers", value=len(ctx.guild.stickers))
         embed.add_field(name="Roles", value=len(ctx.guild.roles))
@@ -184,7 +192,7 @@ class Utility(commands.Cog):
     @commands.guild_only()
     async def channel(self, ctx: commands.Context, channel: discord.abc.GuildChannel = None):
         """Get channel information"""
-        embed = discord.Embed(color=ctx.guild.owner.color)
+        embed = discord.Embed(color=owner_color(ctx.guild))
         if channel is None:
             embed.set_author(
                 name=ctx.guild.name,
@@ -216,11 +224,12 @@ class Utility(commands.Cog):
 
     @commands.command(aliases=["roleinfo", "roles"])
     @commands.guild_only()
+    @chunked_guild()
     async def role(self, ctx: commands.Context, role: discord.Role = None):
         """Get role information"""
         embed = discord.Embed()
         if role is None:
-            embed.color = ctx.guild.owner.color
+            embed.color = owner_color(ctx.guild)
             embed.set_author(
                 name=ctx.guild.name,
                 icon_url=ctx.guild.icon if ctx.guild.icon.url else None,
@@ -248,7 +257,7 @@ class Utility(commands.Cog):
     @commands.guild_only()
     async def _emoji(self, ctx: commands.Context, emoji: discord.Emoji = None):
         """Get emoji information"""
-        embed = discord.Embed(color=ctx.guild.owner.color)
+        embed = discord.Embed(color=owner_color(ctx.guild))
         if emoji is None:
             embed.set_author(
                 name=ctx.guild.name,
@@ -267,6 +276,7 @@ class Utility(commands.Cog):
 
     @commands.command()
     @commands.guild_only()
+    @chunked_guild()
     async def boosters(self, ctx: commands.Context):
         """List all server boosters"""
         if not ctx.guild.premium_subscriber_role:
@@ -1,5 +1,93 @@
+from array import array
+import asyncio
+from bisect import bisect_right
+import math
+from random import randint
+import time
+
+import asyncpg
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
+from redis import RedisError
+from tortoise.exceptions import BaseORMException
+
+from apacheutil import LazyEmbedPaginator, SingleFlight
+from models.daily_progress import DailyProgress
+from models.member_xp import MemberXP
+
+
+# Postgres caps a statement at 32767 parameters, and each row takes at most six
+FLUSH_BATCH_SIZE = 1000
+LEADERBOARD_PAGE_SIZE = 10
+
+daily_tasks = (
+    ("messages", "Send messages", 50),
+    ("attachments", "Share attachments", 5),
+    ("xp", "Earn XP", 500),
+)
+
+
+def _epoch_day():
+    return int(time.time() // 86400)
+
+
+class LevelCurve:
+    # XP needed to go from level n to n + 1 is a * n ** 2 + b * n + c
+    def __init__(self, a = 5, b = 50, c = 100, max_level = 1000):
+        thresholds = array("Q", [0])
+        total = 0
+        for level in range(max_level):
+            total += a * level ** 2 + b * level + c
+            thresholds.append(total)
+        self.thresholds = thresholds
+        self.max_level = max_level
+
+    def level(self, xp):
+        return bisect_right(self.thresholds, xp) - 1
+
+    def levels(self, xps):
+        # Leaderboard pages are sorted by XP, so each search only has to look below the last result
+        thresholds = self.thresholds
+        hi = len(thresholds)
+        previous = None
+        levels = []
+        for xp in xps:
+            if previous is not None and xp > previous:
+                hi = len(thresholds)
+            level = bisect_right(thresholds, xp, 0, hi) - 1
+            levels.append(level)
+            hi = level + 1
+            previous = xp
+        return levels
+
+    def progress(self, xp):
+        level = self.level(xp)
+        if level >= self.max_level:
+            return level, 0, 0
+        return level, xp - self.thresholds[level], self.thresholds[level + 1] - self.thresholds[level]
+
+
+class XPCooldown:
+    # Two generations of packed (guild, user) ids swapped every period, so a member waits one to two periods
+    def __init__(self, period = 60.0):
+        self.period = period
+        self._current = set()
+        self._previous = set()
+        self._rotate_at = time.monotonic() + period
+
+    def __len__(self):
+        return len(self._current) + len(self._previous)
+
+    def hit(self, guild_id, user_id, now):
+        if now >= self._rotate_at:
+            self._previous = self._current if now < self._rotate_at + self.period else set()
+            self._current = set()
+            self._rotate_at = now + self.period
+        key = guild_id << 64 | user_id
+        if key in self._current or key in self._previous:
+            return False
+        self._current.add(key)
+        return True
 
 
 class Experience(commands.Cog):
@@ -7,17 +95,202 @@ class Experience(commands.Cog):
     help_emoji = ":test_tube:"
     help_color = 0x6dc24e
 
+    def __init__(self, bot: commands.AutoShardedBot):
+        super().__init__()
+        self.bot = bot
+        self.xp_min = bot.config.getint("xp", "min", fallback=15)
+        self.xp_max = bot.config.getint("xp", "max", fallback=25)
+        self.curve = LevelCurve(
+            a=bot.config.getint("xp", "curve_a", fallback=5),
+            b=bot.config.getint("xp", "curve_b", fallback=50),
+            c=bot.config.getint("xp", "curve_c", fallback=100),
+            max_level=bot.config.getint("xp", "max_level", fallback=1000),
+        )
+        self.cooldown = XPCooldown(bot.config.getfloat("xp", "cooldown", fallback=60.0))
+        self.pending = {}
+        self.pending_daily = {}
+        self.flushing = None
+        self.rebuilds = SingleFlight()
+        self.flusher.change_interval(seconds=bot.config.getfloat("xp", "flush_interval", fallback=30.0))
+
+    async def cog_load(self):
+        # Connection drops can surface from asyncpg unwrapped, and they shouldn't end the loop
+        self.flusher.add_exception_type(BaseORMException, asyncpg.PostgresError, asyncpg.InterfaceError, OSError, RedisError)
+        self.flusher.start()
+
+    async def cog_unload(self):
+        self.flusher.cancel()
+        if self.flushing:
+            # A flush the cancel landed in keeps running; failed rows are re-queued for the final flush
+            await asyncio.gather(self.flushing, return_exceptions=True)
+        await self.flush()
+
+    async def flush(self):
+        # Swap the buffer first so messages arriving mid-flush land in the next batch
+        pending, self.pending = self.pending, {}
+        rows = [(guild_id, user_id, xp, messages) for (guild_id, user_id), (xp, messages) in pending.items()]
+        try:
+            await self._flush_xp(pending, rows)
+        finally:
+            await self.flush_daily()
+
+    async def _flush_xp(self, pending, rows):
+        stale = set()
+        try:
+            for i in range(0, len(rows), FLUSH_BATCH_SIZE):
+                batch = rows[i:i + FLUSH_BATCH_SIZE]
+                try:
+                    totals = await MemberXP.add_xp(batch)
+                except Exception:
+                    # Put back this batch and every one after it, or they'd be lost with the swapped buffer
+                    for guild_id, user_id, xp, messages in rows[i:]:
+                        self._add(guild_id, user_id, xp, messages)
+                    raise
+                for row in totals:
+                    gained = pending[(row["guild_id"], row["user_id"])][0]
+                    level = self.curve.level(row["xp"])
+                    if level > self.curve.level(row["xp"] - gained):
+                        self.bot.dispatch("level_up", row["guild_id"], row["user_id"], level)
+                # Postgres hands back the new totals, so the sorted sets get absolute scores
+                try:
+                    async with self.bot.redis.pipeline(transaction=False) as pipe:
+                        for row in totals:
+                            pipe.zadd(f"xp:{row["guild_id"]}", {row["user_id"]: row["xp"]})
+                        await pipe.execute()
+                except RedisError:
+                    # The totals are already in Postgres, so keep going and rebuild these sets later
+                    stale.update(row["guild_id"] for row in totals)
+        finally:
+            if stale:
+                await self.bot.redis.delete(*(f"xp:{guild_id}:ready" for guild_id in stale))
+
+    async def flush_daily(self):
+        pending, self.pending_daily = self.pending_daily, {}
+        rows = [(guild_id, user_id, *progress) for (guild_id, user_id), progress in pending.items()]
+        for i in range(0, len(rows), FLUSH_BATCH_SIZE):
+            batch = rows[i:i + FLUSH_BATCH_SIZE]
+            try:
+                await DailyProgress.add_progress(batch)
+            except Exception:
+                for guild_id, user_id, day, messages, attachments, xp in rows[i:]:
+                    self._add_daily(guild_id, user_id, day, messages, attachments, xp)
+                raise
+
+    def _add_daily(self, guild_id, user_id, day, messages = 0, attachments = 0, xp = 0):
+        key = (guild_id, user_id)
+        pending = self.pending_daily.get(key)
+        # Counters from a previous day are dropped here, the same way the upsert resets stored rows
+        if pending is None or pending[0] < day:
+            self.pending_daily[key] = [day, messages, attachments, xp]
+        elif pending[0] == day:
+            pending[1] += messages
+            pending[2] += attachments
+            pending[3] += xp
+
+    def _add(self, guild_id, user_id, xp, messages = 1):
+        key = (guild_id, user_id)
+        pending = self.pending.get(key)
+        self.pending[key] = (pending[0] + xp, pending[1] + messages) if pending else (xp, messages)
+
+    async def ensure_leaderboard(self, guild_id):
+        # Flushes may have created a partial set, so the marker is what says it was loaded in full
+        if not await self.bot.redis.exists(f"xp:{guild_id}:ready"):
+            await self.rebuilds.do(guild_id, self.rebuild_leaderboard, guild_id)
+        return f"xp:{guild_id}"
+
+    async def rebuild_leaderboard(self, guild_id):
+        redis_name = f"xp:{guild_id}"
+        rows = await MemberXP.filter(guild_id=guild_id).values_list("user_id", "xp")
+        async with self.bot.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(redis_name)
+            for i in range(0, len(rows), 10000):
+                pipe.zadd(redis_name, dict(rows[i:i + 10000]))
+            pipe.set(f"{redis_name}:ready", 1)
+            await pipe.execute()
+
+    @tasks.loop(seconds=30.0)
+    async def flusher(self):
+        # The buffer is swapped out before the writes, so cancelling mid-flush would lose it
+        self.flushing = asyncio.ensure_future(self.flush())
+        await asyncio.shield(self.flushing)
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if message.guild is None or message.author.bot:
+            return
+        day = _epoch_day()
+        attachments = 1 if message.attachments else 0
+        if not self.cooldown.hit(message.guild.id, message.author.id, time.monotonic()):
+            return self._add_daily(message.guild.id, message.author.id, day, 1, attachments)
+        xp = randint(self.xp_min, self.xp_max)
+        self._add(message.guild.id, message.author.id, xp)
+        self._add_daily(message.guild.id, message.author.id, day, 1, attachments, xp)
+
     @commands.command(aliases=["rank", "lvl"])
-    async def level(self, ctx: commands.Context):
+    @commands.guild_only()
+    async def level(self, ctx: commands.Context, member: discord.Member = None):
         """Show your level"""
+        if member is None:
+            member = ctx.author
+        redis_name = await self.ensure_leaderboard(ctx.guild.id)
+        async with self.bot.redis.pipeline(transaction=False) as pipe:
+            rank, xp = await pipe.zrevrank(redis_name, member.id).zscore(redis_name, member.id).execute()
+        if rank is None:
+            return await ctx.reply(f":x: {member.name} has no XP yet.")
+        embed = discord.Embed(color=member.color)
+        embed.set_author(name=member.display_name, icon_url=member.display_avatar.url)
+        level, progress, needed = self.curve.progress(int(xp))
+        embed.add_field(name="Rank", value=f"#{rank + 1}")
+        embed.add_field(name="Level", value=level)
+        embed.add_field(name="XP", value=f"{progress}/{needed}" if needed else int(xp))
+        embed.set_footer(text=f"{int(xp)} total XP")
+        await ctx.reply(embed=embed)
 
     @commands.command(aliases=["lb"])
+    @commands.guild_only()
     async def leaderboard(self, ctx: commands.Context):
         """Show the XP leaderboard for the server"""
+        redis_name = await self.ensure_leaderboard(ctx.guild.id)
+        count = await self.bot.redis.zcard(redis_name)
+        if count == 0:
+            return await ctx.reply(":x: Nobody has any XP yet.")
+
+        async def load_page(index):
+            start = index * LEADERBOARD_PAGE_SIZE
+            # Each page is a ranged read on the sorted set, never a sort over the whole guild
+            rows = await self.bot.redis.zrevrange(redis_name, start, start + LEADERBOARD_PAGE_SIZE - 1, withscores=True)
+            levels = self.curve.levels(int(xp) for _, xp in rows)
+            embed = discord.Embed(
+                title=f"{ctx.guild.name} Leaderboard",
+                description="\n".join(
+                    f"{start + i + 1}. <@{user_id}> Level **{level}** ({int(xp)} XP)"
+                    for i, ((user_id, xp), level) in enumerate(zip(rows, levels))
+                ),
+                color=self.help_color,
+            )
+            embed.set_footer(text=f"{count} member{"" if count == 1 else "s"}")
+            return embed
+
+        await LazyEmbedPaginator(ctx, math.ceil(count / LEADERBOARD_PAGE_SIZE), load_page).start()
 
     @commands.command()
+    @commands.guild_only()
     async def daily(self, ctx: commands.Context):
         """List daily tasks"""
+        day = _epoch_day()
+        row = await DailyProgress.get_or_none(guild_id=ctx.guild.id, user_id=ctx.author.id)
+        # A row from an earlier day simply counts as no progress, nothing ever resets it eagerly
+        progress = [getattr(row, key) if row and row.day == day else 0 for key, _, _ in daily_tasks]
+        pending = self.pending_daily.get((ctx.guild.id, ctx.author.id))
+        if pending and pending[0] == day:
+            progress = [p + q for p, q in zip(progress, pending[1:])]
+        embed = discord.Embed(title="Daily Tasks", color=self.help_color)
+        embed.set_author(name=ctx.author.display_name, icon_url=ctx.author.display_avatar.url)
+        for (_, name, goal), value in zip(daily_tasks, progress):
+            done = ":white_check_mark:" if value >= goal else ":hourglass:"
+            embed.add_field(name=f"{done} {name}", value=f"{min(value, goal)}/{goal}", inline=False)
+        embed.add_field(name="Resets", value=f"<t:{(day + 1) * 86400}:R>", inline=False)
+        await ctx.reply(embed=embed)
 
     @commands.command()
     async def shop(self, ctx: commands.Context):
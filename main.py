@@ -1,18 +1,24 @@
+import aiohttp
 import asyncio
 import configparser
 import datetime
 import inspect
+import json
+import logging
 import os
 import psutil
 import re
+import time
 
 import discord
 from discord import ActivityType, ChannelType
 from discord.ext import commands
-import redis
+from discord.http import Route
+import redis.asyncio as redis
 from tortoise import Tortoise
+import yarl
 
-from apacheutil import EmbedPaginator
+from apacheutil import EmbedPaginator, LRUCache, SingleFlight
 from models.guild_config import GuildConfig
 
 
@@ -23,7 +29,19 @@ cogs = (
     "util",
     "xp",
 )
+# Gateway intents each cog relies on, on top of what prefix commands need
+cog_intents = {
+    "dev": discord.Intents.none(),
+    "fun": discord.Intents.none(),
+    "mod": discord.Intents(members=True),
+    "util": discord.Intents(members=True, presences=True, emojis_and_stickers=True),
+    "xp": discord.Intents.none(),
+}
 cwd_len = len(os.getcwd())
+log = logging.getLogger("apachengine")
+
+GUILD_CONFIG_CHANNEL = "guild_configs:invalidate"
+CLUSTER_STATS = "cluster_stats"
 
 activity_types = {
     "playing": ActivityType.playing,
@@ -35,6 +53,28 @@ activity_types = {
 }
 
 
+def get_intents(config):
+    if config.get("intents", "profile", fallback="cogs") == "all":
+        intents = discord.Intents.all()
+    else:
+        intents = discord.Intents(guilds=True, guild_messages=True, dm_messages=True, message_content=True)
+        for cog in cogs:
+            intents |= cog_intents[cog]
+    if config.has_section("intents"):
+        for name in config["intents"]:
+            if name in discord.Intents.VALID_FLAGS:
+                setattr(intents, name, config.getboolean("intents", name))
+    return intents
+
+
+def get_member_cache_flags(config, intents: discord.Intents):
+    # No cog looks at voice state, so only members seen through the members intent are kept
+    return discord.MemberCacheFlags(
+        joined=intents.members and config.getboolean("intents", "member_cache", fallback=True),
+        voice=False,
+    )
+
+
 async def send_messages_check(ctx: commands.Context):
     if ctx.guild is None:
         return True
@@ -44,6 +84,10 @@ async def send_messages_check(ctx: commands.Context):
     return permissions.send_messages
 
 
+def _guild_config_mapping(config: GuildConfig):
+    return {k: v for k in config._meta.fields if (v := getattr(config, k)) != None}
+
+
 class Help(commands.HelpCommand):
     def get_bot_mapping(self):
         mapping = [[cog, cog.get_commands()] for cog in self.context.bot.cogs.values()]
@@ -158,9 +202,22 @@ class ApacheContext(commands.Context):
 
 
 class Apachengine(commands.AutoShardedBot):
-    def __init__(self, config, r):
+    def __init__(self, config, r, cluster_id = 0, **kwargs):
         self.config = config
         self.redis = r
+        self.cluster_id = cluster_id
+        self.guild_configs = LRUCache(
+            maxsize=config.getint("cache", "guild_configs_size", fallback=10000),
+            ttl=config.getfloat("cache", "guild_configs_ttl", fallback=300.0),
+        )
+        self.guild_config_loads = SingleFlight()
+        self.guild_config_negative_ttl = config.getint("cache", "guild_configs_negative_ttl", fallback=3600)
+        self.guild_config_listener = None
+        self.cluster_stats_publisher = None
+        self.max_concurrency = 1
+        self.shard_started_at = {}
+        self.shard_ready_timings = {}
+        self.session = None
         self.ready_at = 0
         self.process = psutil.Process()
         activity_name = config["activity"]["name"]
@@ -172,20 +229,122 @@ class Apachengine(commands.AutoShardedBot):
             state=activity_name if activity_type == ActivityType.custom else None,
         )
         allowed_mentions = discord.AllowedMentions.none()
-        intents = discord.Intents.all()
+        intents = get_intents(config)
         super().__init__(
             activity=activity,
             allowed_mentions=allowed_mentions,
+            chunk_guilds_at_startup=config.getboolean("intents", "chunk_at_startup", fallback=False),
             command_prefix=commands.when_mentioned_or(config["bot"]["command_prefix"]),
-            enable_debug_events=True,
+            enable_debug_events=config.getboolean("intents", "debug_events", fallback=False),
             help_command=Help(),
             intents=intents,
+            member_cache_flags=get_member_cache_flags(config, intents),
             status=config["bot"]["status"],
+            **kwargs,
+        )
+
+    async def setup_hook(self):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=64, limit_per_host=16, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=15.0),
         )
+        self.guild_config_listener = asyncio.create_task(self._listen_guild_config_invalidations())
+        self.cluster_stats_publisher = asyncio.create_task(self._publish_cluster_stats())
+
+    async def close(self):
+        if self.guild_config_listener:
+            self.guild_config_listener.cancel()
+        if self.cluster_stats_publisher:
+            self.cluster_stats_publisher.cancel()
+        if self.session:
+            await self.session.close()
+        await super().close()
+
+    async def _listen_guild_config_invalidations(self):
+        while not self.is_closed():
+            try:
+                async with self.redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(GUILD_CONFIG_CHANNEL)
+                    # Anything published while we were disconnected is lost
+                    self.guild_configs.clear()
+                    async for message in pubsub.listen():
+                        try:
+                            guild_id = int(message["data"])
+                        except ValueError:
+                            log.warning("Ignoring bad guild config invalidation %r", message["data"])
+                            continue
+                        self.guild_configs.pop(guild_id)
+            except redis.RedisError:
+                log.exception("Guild config invalidation listener lost its connection, retrying")
+                await asyncio.sleep(5.0)
+
+    async def _publish_cluster_stats(self):
+        await self.wait_until_ready()
+        while not self.is_closed():
+            stats = {"guilds": len(self.guilds), "users": len(self.users), "updated_at": time.time()}
+            try:
+                await self.redis.hset(CLUSTER_STATS, str(self.cluster_id), json.dumps(stats))
+            except redis.RedisError:
+                pass
+            await asyncio.sleep(30.0)
+
+    async def get_cluster_stats(self):
+        guilds = len(self.guilds)
+        users = len(self.users)
+        try:
+            clusters = await self.redis.hgetall(CLUSTER_STATS)
+        except redis.RedisError:
+            return guilds, users
+        now = time.time()
+        for cluster_id, stats in clusters.items():
+            stats = json.loads(stats)
+            # Skip ourselves (we have live numbers) and clusters that stopped reporting
+            if int(cluster_id) == self.cluster_id or now - stats["updated_at"] > 90.0:
+                continue
+            guilds += stats["guilds"]
+            users += stats["users"]
+        return guilds, users
 
     async def on_ready(self):
         self.ready_at = datetime.datetime.now()
 
+    async def launch_shards(self):
+        if self.is_closed():
+            return
+        data = await self.http.request(Route("GET", "/gateway/bot"))
+        self.max_concurrency = data["session_start_limit"]["max_concurrency"]
+        gateway = yarl.URL(data["url"])
+        if self.shard_count is None:
+            self.shard_count = data["shards"]
+        self._connection.shard_count = self.shard_count
+        shard_ids = self.shard_ids or range(self.shard_count)
+        self._connection.shard_ids = shard_ids
+        # Consecutive shards fall into different identify buckets, so each batch can identify at once
+        for i in range(0, len(shard_ids), self.max_concurrency):
+            batch = shard_ids[i:i + self.max_concurrency]
+            for shard_id in batch:
+                self.shard_started_at[shard_id] = time.monotonic()
+            await asyncio.gather(*(
+                self.launch_shard(gateway, shard_id, initial=shard_id == shard_ids[0])
+                for shard_id in batch
+            ))
+
+    async def before_identify_hook(self, shard_id, *, initial = False):
+        # Buckets are shared by every cluster, so claim ours in Redis for the 5 second window
+        bucket = f"identify:{shard_id % self.max_concurrency}"
+        try:
+            while not await self.redis.set(bucket, self.cluster_id, nx=True, px=5500):
+                await asyncio.sleep(0.5)
+        except redis.RedisError:
+            await super().before_identify_hook(shard_id, initial=initial)
+
+    async def on_shard_ready(self, shard_id):
+        started_at = self.shard_started_at.pop(shard_id, None)
+        if started_at is not None:
+            self.shard_ready_timings[shard_id] = elapsed = time.monotonic() - started_at
+            log.info("Shard ID %s became ready in %.2fs", shard_id, elapsed)
+        await self.warm_guild_configs([g.id for g in self.guilds if g.shard_id == shard_id])
+
     async def get_context(self, message, *, cls = ApacheContext):
         return await super().get_context(message, cls=cls)
 
@@ -195,7 +354,6 @@ class Apachengine(commands.AutoShardedBot):
             await ctx.reply(f":x: I am missing permissions:\n\n- `{"\n- `".join(error.missing_permissions)}`")
 
     async def start(self):
-        discord.utils.setup_logging()
         for cog in cogs:
             await self.load_extension(f"cogs.{cog}")
         async with self:
@@ -215,30 +373,81 @@ class Apachengine(commands.AutoShardedBot):
         return datetime.timedelta(seconds=seconds) if delta else seconds
 
     async def get_guild_config(self, guild: discord.Guild):
-        redis_name = f"guild_configs:{guild.id}"
-        cached = self.redis.hgetall(redis_name)
+        config = self.guild_configs.get(guild.id)
+        if config is not None:
+            return config
+        return await self.guild_config_loads.do(guild.id, self._load_guild_config, guild.id)
+
+    async def _load_guild_config(self, guild_id):
+        redis_name = f"guild_configs:{guild_id}"
+        cached = await self.redis.hgetall(redis_name)
         if cached:
-            return GuildConfig(**cached)
-        config = await GuildConfig.get_or_none(id=guild.id)
-        if config:
-            mapping = {k: v for k in config._meta.fields if (v := getattr(config, k)) != None}
-            self.redis.hset(redis_name, mapping=mapping)
-            self.redis.expire(redis_name, 86400)
+            config = GuildConfig(**cached)
+            self.guild_configs.set(guild_id, config)
             return config
-        return GuildConfig(id=guild.id)
+        config = await GuildConfig.get_or_none(id=guild_id)
+        if config:
+            ex = 86400
+        else:
+            # Unconfigured guilds are cached as a hash holding only the id
+            config = GuildConfig(id=guild_id)
+            ex = self.guild_config_negative_ttl
+        async with self.redis.pipeline(transaction=False) as pipe:
+            await pipe.hset(redis_name, mapping=_guild_config_mapping(config)).expire(redis_name, ex).execute()
+        self.guild_configs.set(guild_id, config)
+        return config
+
+    async def warm_guild_configs(self, guild_ids, batch_size = 1000):
+        guild_ids = [i for i in guild_ids if i not in self.guild_configs]
+        # Past the LRU's size, local inserts would only evict each other, so the rest just warm Redis
+        local = set(guild_ids[:max(self.guild_configs.maxsize - len(self.guild_configs), 0)])
+        for i in range(0, len(guild_ids), batch_size):
+            batch = guild_ids[i:i + batch_size]
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for guild_id in batch:
+                    pipe.hgetall(f"guild_configs:{guild_id}")
+                cached = await pipe.execute()
+            missing = []
+            for guild_id, mapping in zip(batch, cached):
+                if not mapping:
+                    missing.append(guild_id)
+                elif guild_id in local:
+                    self.guild_configs.set(guild_id, GuildConfig(**mapping))
+            if not missing:
+                continue
+            configs = {c.id: c for c in await GuildConfig.filter(id__in=missing)}
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for guild_id in missing:
+                    config = configs.get(guild_id) or GuildConfig(id=guild_id)
+                    redis_name = f"guild_configs:{guild_id}"
+                    pipe.hset(redis_name, mapping=_guild_config_mapping(config))
+                    pipe.expire(redis_name, 86400 if guild_id in configs else self.guild_config_negative_ttl)
+                    if guild_id in local:
+                        self.guild_configs.set(guild_id, config)
+                await pipe.execute()
 
     async def update_guild_config(self, guild: discord.Guild, **kwargs):
+        config = await GuildConfig.upsert(guild.id, **kwargs)
         redis_name = f"guild_configs:{guild.id}"
-        if self.redis.exists(redis_name):
-            self.redis.hset(redis_name, mapping=kwargs)
-        await GuildConfig.update_or_create(id=guild.id, defaults=kwargs)
-        # Return a fake object because it's not worth making two requests
-        return GuildConfig(**kwargs)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(redis_name)
+            pipe.hset(redis_name, mapping=_guild_config_mapping(config))
+            pipe.expire(redis_name, 86400)
+            pipe.publish(GUILD_CONFIG_CHANNEL, guild.id)
+            await pipe.execute()
+        self.guild_configs.set(guild.id, config)
+        return config
 
 
-async def main():
+def load_config():
     config = configparser.ConfigParser()
     config.read("config.local.ini")
+    return config
+
+
+async def main(config = None, cluster_id = 0, **kwargs):
+    if config is None:
+        config = load_config()
     user = config["db"]["user"] or os.getenv("DB_USER")
     password = config["db"]["password"] or os.getenv("DB_PASSWORD")
     database = config["db"]["database"] or os.getenv("DB_DATABASE")
@@ -246,18 +455,27 @@ async def main():
     port = config["db"]["port"] or os.getenv("DB_PORT")
     await Tortoise.init(
         db_url=f"postgres://{user}:{password}@{host}:{port}/{database}",
-        modules={"models": ["models.guild_config"]},
+        modules={"models": ["models.daily_progress", "models.guild_config", "models.member_xp"]},
     )
     await Tortoise.generate_schemas()
-    r = redis.Redis(
+    # Callers wait for a free connection instead of failing when the pool is exhausted
+    pool = redis.BlockingConnectionPool(
         host=config["redis"]["host"] or os.getenv("REDIS_HOST"),
         port=config["redis"]["port"] or os.getenv("REDIS_PORT"),
         db=0,
         decode_responses=True,
+        max_connections=config.getint("redis", "max_connections", fallback=32),
+        timeout=config.getfloat("redis", "pool_timeout", fallback=10.0),
     )
-    bot = Apachengine(config=config, r=r)
-    await bot.start()
+    r = redis.Redis.from_pool(pool)
+    bot = Apachengine(config=config, r=r, cluster_id=cluster_id, **kwargs)
+    try:
+        await bot.start()
+    finally:
+        await r.aclose()
+        await Tortoise.close_connections()
 
 
 if __name__ == "__main__":
+    discord.utils.setup_logging()
     asyncio.run(main())
@@ -0,0 +1,38 @@
+from tortoise import fields
+from tortoise.models import Model
+
+
+class DailyProgress(Model):
+    id = fields.BigIntField(pk=True)
+    guild_id = fields.BigIntField()
+    user_id = fields.BigIntField()
+    day = fields.IntField()
+    messages = fields.IntField(default=0)
+    attachments = fields.IntField(default=0)
+    xp = fields.IntField(default=0)
+
+    class Meta:
+        table = "daily_progress"
+        unique_together = (("guild_id", "user_id"),)
+
+    @classmethod
+    async def add_progress(cls, rows):
+        # rows are (guild_id, user_id, day, messages, attachments, xp) increments.
+        # A row from an earlier day is overwritten rather than added to, which is the whole reset.
+        # A late batch for a day that's already over is dropped so it can't roll the row back.
+        values = []
+        placeholders = []
+        for i, row in enumerate(rows):
+            placeholders.append(f"({", ".join(f"${i * 6 + j}" for j in range(1, 7))})")
+            values.extend(row)
+        table = cls._meta.db_table
+        counters = ", ".join(
+            f'"{c}" = CASE WHEN EXCLUDED."day" = "{table}"."day" THEN "{table}"."{c}" + EXCLUDED."{c}" '
+            f'WHEN EXCLUDED."day" > "{table}"."day" THEN EXCLUDED."{c}" ELSE "{table}"."{c}" END'
+            for c in ("messages", "attachments", "xp")
+        )
+        query = (
+            f'INSERT INTO "{table}" ("guild_id", "user_id", "day", "messages", "attachments", "xp") VALUES {", ".join(placeholders)} '
+            f'ON CONFLICT ("guild_id", "user_id") DO UPDATE SET {counters}, "day" = GREATEST("{table}"."day", EXCLUDED."day")'
+        )
+        await cls._meta.db.execute_query(query, values)
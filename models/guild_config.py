@@ -10,3 +10,16 @@ class GuildConfig(Model):
     welcome_description = fields.TextField(null=True)
     welcome_image = fields.CharField(max_length=200, null=True)
     welcome_footer = fields.TextField(null=True)
+
+    @classmethod
+    async def upsert(cls, id, **kwargs):
+        projection = cls._meta.fields_db_projection
+        columns = [projection["id"], *(projection[k] for k in kwargs)]
+        placeholders = ", ".join(f"${i}" for i in range(1, len(columns) + 1))
+        updates = ", ".join(f'"{c}" = EXCLUDED."{c}"' for c in columns[1:])
+        query = (
+            f'INSERT INTO "{cls._meta.db_table}" ({", ".join(f'"{c}"' for c in columns)}) VALUES ({placeholders}) '
+            f'ON CONFLICT ("id") DO UPDATE SET {updates} RETURNING *'
+        )
+        rows = await cls._meta.db.execute_query_dict(query, [id, *kwargs.values()])
+        return cls._init_from_db(**rows[0])
@@ -0,0 +1,31 @@
+from tortoise import fields
+from tortoise.models import Model
+
+
+class MemberXP(Model):
+    id = fields.BigIntField(pk=True)
+    guild_id = fields.BigIntField()
+    user_id = fields.BigIntField()
+    xp = fields.BigIntField(default=0)
+    messages = fields.IntField(default=0)
+
+    class Meta:
+        table = "member_xp"
+        unique_together = (("guild_id", "user_id"),)
+        indexes = (("guild_id", "xp"),)
+
+    @classmethod
+    async def add_xp(cls, rows):
+        # rows are (guild_id, user_id, xp, messages) increments, applied in one statement
+        values = []
+        placeholders = []
+        for i, row in enumerate(rows):
+            placeholders.append(f"(${i * 4 + 1}, ${i * 4 + 2}, ${i * 4 + 3}, ${i * 4 + 4})")
+            values.extend(row)
+        table = cls._meta.db_table
+        query = (
+            f'INSERT INTO "{table}" ("guild_id", "user_id", "xp", "messages") VALUES {", ".join(placeholders)} '
+            f'ON CONFLICT ("guild_id", "user_id") DO UPDATE SET "xp" = "{table}"."xp" + EXCLUDED."xp", '
+            f'"messages" = "{table}"."messages" + EXCLUDED."messages" RETURNING "guild_id", "user_id", "xp"'
+        )
+        return await cls._meta.db.execute_query_dict(query, values)